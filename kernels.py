@@ -0,0 +1,208 @@
+"""Numba kernels shared by the Streamlit apps, with NumPy fallbacks.
+
+Streamlit re-executes a page script on every rerun, so kernels defined
+there are re-dispatched each time. Living in an imported module, they are
+compiled (or loaded from the on-disk cache) and warmed once per process.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit, prange, get_num_threads
+except ImportError:  # numba is optional; see _rolling_stats_np and variance()
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def _welford_add(count, mean, m2, x):
+        """Add one sample to a Welford accumulator"""
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        m2 += delta * (x - mean)
+        return count, mean, m2
+
+    @njit(cache=True)
+    def _welford_remove(count, mean, m2, x):
+        """Remove one sample from a Welford accumulator"""
+        count -= 1
+        if count == 0:
+            return 0, 0.0, 0.0
+        delta = x - mean
+        mean -= delta / count
+        m2 -= delta * (x - mean)
+        return count, mean, m2
+
+    @njit(cache=True)
+    def _welford_slide(mean, m2, x_old, x_new, w):
+        """Replace one sample of a full window of size w in a single update"""
+        delta = x_new - x_old
+        new_mean = mean + delta / w
+        m2 += delta * (x_new - new_mean + x_old - mean)
+        return new_mean, m2
+
+    # inline='always' lets the fixed-window kernels below see `w` as a constant
+    @njit(cache=True, nogil=True, inline='always')
+    def rolling_stats(close, w, ret, vol, ma):
+        """Fill returns, rolling SD of returns and rolling MA in one pass over close"""
+        n, k = close.shape
+        for j in range(k):
+            prev = np.nan
+            r_count, r_mean, r_m2 = 0, 0.0, 0.0
+            c_count, c_mean, c_m2 = 0, 0.0, 0.0
+            for i in range(n):
+                # pct_change, forward-filling over missing prices like pandas
+                price = close[i, j]
+                filled = prev if np.isnan(price) else price
+                r = filled / prev - 1.0
+                prev = filled
+                ret[i, j] = r
+
+                # A full window with valid samples on both ends slides in one
+                # step; otherwise drop the leaving sample, then add the new one
+                r_old = ret[i - w, j] if i >= w else np.nan
+                if r_count == w and not np.isnan(r_old) and not np.isnan(r):
+                    r_mean, r_m2 = _welford_slide(r_mean, r_m2, r_old, r, w)
+                else:
+                    if not np.isnan(r_old):
+                        r_count, r_mean, r_m2 = _welford_remove(r_count, r_mean, r_m2, r_old)
+                    if not np.isnan(r):
+                        r_count, r_mean, r_m2 = _welford_add(r_count, r_mean, r_m2, r)
+                c_old = close[i - w, j] if i >= w else np.nan
+                if c_count == w and not np.isnan(c_old) and not np.isnan(price):
+                    c_mean, c_m2 = _welford_slide(c_mean, c_m2, c_old, price, w)
+                else:
+                    if not np.isnan(c_old):
+                        c_count, c_mean, c_m2 = _welford_remove(c_count, c_mean, c_m2, c_old)
+                    if not np.isnan(price):
+                        c_count, c_mean, c_m2 = _welford_add(c_count, c_mean, c_m2, price)
+
+                # Like pandas, only emit once the window is full of valid samples
+                vol[i, j] = np.sqrt(max(r_m2, 0.0) / (w - 1)) if r_count == w else np.nan
+                ma[i, j] = c_mean if c_count == w else np.nan
+
+    @njit(parallel=True, cache=True)
+    def welford_var(x, n_chunks):
+        """Population variance via chunked Welford, merged with Chan's formula"""
+        n = x.shape[0]
+        n_chunks = max(1, min(n, n_chunks))
+        counts = np.zeros(n_chunks)
+        means = np.zeros(n_chunks)
+        m2s = np.zeros(n_chunks)
+        for c in prange(n_chunks):
+            lo = c * n // n_chunks
+            hi = (c + 1) * n // n_chunks
+            mean = 0.0
+            m2 = 0.0
+            for i in range(lo, hi):
+                delta = x[i] - mean
+                mean += delta / (i - lo + 1)
+                m2 += delta * (x[i] - mean)
+            counts[c] = hi - lo
+            means[c] = mean
+            m2s[c] = m2
+        # Combine the per-chunk (n, mean, M2) partials
+        n_a = 0.0
+        mean_a = 0.0
+        m2_a = 0.0
+        for c in range(n_chunks):
+            n_b = counts[c]
+            if n_b == 0:
+                continue
+            n_ab = n_a + n_b
+            delta = means[c] - mean_a
+            mean_a += delta * n_b / n_ab
+            m2_a += m2s[c] + delta * delta * n_a * n_b / n_ab
+            n_a = n_ab
+        return m2_a / n_a
+
+    _kernels = {}
+
+    def _fixed_window_kernel(w):
+        """rolling_stats compiled for one window size, reused on every later call
+
+        The window is a closure constant, so the divisor and the leaving index
+        are known at compile time. The slider only spans 5-90 days and the
+        cache key includes `w`, so each size is compiled once and then loaded
+        from disk."""
+        kernel = _kernels.get(w)
+        if kernel is None:
+            @njit(cache=True, nogil=True)
+            def kernel(close, ret, vol, ma):
+                rolling_stats(close, w, ret, vol, ma)
+            _kernels[w] = kernel
+        return kernel
+
+def _rolling_stats_np(close, w, ret, vol, ma):
+    """NumPy version of rolling_stats, reducing over strided window views"""
+    n = close.shape[0]
+    # pct_change, forward-filling over missing prices like pandas
+    rows = np.where(np.isnan(close), 0, np.arange(n)[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = np.take_along_axis(close, rows, axis=0)
+    ret[0] = np.nan
+    ret[1:] = filled[1:] / filled[:-1] - 1.0
+
+    # A NaN anywhere in a window propagates, matching pandas' min_periods=window
+    vol[:] = np.nan
+    ma[:] = np.nan
+    if n >= w:
+        vol[w - 1:] = sliding_window_view(ret, w, axis=0).std(axis=-1, ddof=1)
+        ma[w - 1:] = sliding_window_view(close, w, axis=0).mean(axis=-1)
+
+def _column_kernel(w):
+    """Per-column kernel for window `w`: specialised Numba, else the NumPy path"""
+    if njit is not None:
+        return _fixed_window_kernel(w)
+    return lambda close, ret, vol, ma: _rolling_stats_np(close, w, ret, vol, ma)
+
+def rolling_panel(close_arr, window):
+    """Close, return, rolling SD and rolling MA blocks side by side, column-major
+
+    The result has shape (n, 4 * k) for k tickers. Each ticker's column is
+    processed on its own thread; the Numba kernel releases the GIL, as do
+    NumPy's reductions in the fallback."""
+    n, k = close_arr.shape
+    # One buffer holding every output; the kernel writes into views of it
+    out = np.empty((n, 4 * k), order='F')
+    out[:, :k] = close_arr
+    kernel = _column_kernel(window)
+
+    def run(j):
+        cols = [slice(b * k + j, b * k + j + 1) for b in range(4)]
+        kernel(out[:, cols[0]], out[:, cols[1]], out[:, cols[2]], out[:, cols[3]])
+
+    if k == 1:
+        # No pool for a single ticker. This also keeps the import-time warm-up on
+        # the importing thread: compiling on a worker would wait on the import
+        # lock this module holds, deadlocking the import
+        run(0)
+        return out
+    with ThreadPoolExecutor(max_workers=min(k, os.cpu_count() or 1)) as ex:
+        list(ex.map(run, range(k)))
+    return out
+
+# Streamlit runs each session's script on its own thread, and Numba's default
+# workqueue threading layer aborts the process on concurrent parallel launches
+_parallel_lock = threading.Lock()
+
+def variance(x):
+    """Population variance, using the parallel Welford kernel when numba is present"""
+    if njit is None:
+        return np.var(x)
+    with _parallel_lock:
+        # Thread count is read here: calling it inside the kernel would block caching
+        return welford_var(x, get_num_threads())
+
+# Compile (or load from cache) now instead of on the first user request
+if njit is not None:
+    try:
+        # 30 days is the stock app's default window
+        rolling_panel(np.ones((32, 1)), 30)
+        variance(np.zeros(4))
+    except Exception:  # a real failure will surface on the first actual call
+        pass
@@ -1,269 +1,555 @@
-import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import google.generativeai as genai
-from datetime import datetime
-from functools import lru_cache
-
-# Configuration
-st.set_page_config(
-    page_title="📊 Stock Volatility Analyzer",
-    layout="wide",
-    page_icon="📈"
-)
-
-# Custom CSS
-st.markdown("""
-<style>
-    [data-testid=stSidebar] {
-        background: linear-gradient(0deg, #2C3E50 0%, #3498DB 100%);
-        color: white;
-    }
-    .main .block-container {
-        background: linear-gradient(180deg, #ffffff 0%, #f8f9fa 100%);
-        padding: 2rem 2.5rem;
-    }
-    h1, h2, h3 {
-        color: #2C3E50 !important;
-        border-bottom: 2px solid #3498DB;
-        padding-bottom: 0.3rem;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-    }
-    .metric-box {
-        padding: 1.5rem;
-        border-radius: 10px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        background: white;
-        margin: 0.5rem 0;
-        transition: all 0.3s ease;
-    }
-    .metric-box:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 6px 12px rgba(0,0,0,0.15) !important;
-    }
-    .gemini-insight {
-        background: #f0f4f8;
-        border-left: 4px solid #3498DB;
-        padding: 1.5rem;
-        border-radius: 8px;
-        margin: 1.5rem 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    [data-baseweb="tab-list"] {
-        gap: 10px;
-    }
-    [data-baseweb="tab"] {
-        background: #e8f4fc !important;
-        border-radius: 8px !important;
-        padding: 8px 20px !important;
-        transition: all 0.3s ease !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Sidebar - Concepts & Controls
-with st.sidebar:
-    st.title("📘 Concepts & Controls")
-    
-    # Gemini API Setup
-    st.subheader("🔑 Gemini API Setup")
-    gemini_api_key = st.text_input("Enter Gemini API Key", type="password",
-                                 help="Get from https://aistudio.google.com/app/apikey")
-    
-    # Risk Parameters
-    st.subheader("⚙️ Risk Parameters")
-    low_threshold = st.slider("Low Risk Threshold", 0.0, 0.1, 0.015, 0.001)
-    medium_threshold = st.slider("Medium Risk Threshold", 0.0, 0.1, 0.03, 0.001)
-    rolling_window = st.slider("Rolling Window (Days)", 5, 90, 30)
-    
-    # Educational Content
-    st.subheader("📚 Key Concepts")
-    st.markdown(f"""
-    - **Volatility**: Measured via Standard Deviation (SD) of returns
-    - **Risk Levels**:
-        - 🔴 High: SD > {medium_threshold}
-        - 🟡 Medium: {low_threshold} < SD ≤ {medium_threshold}
-        - 🟢 Low: SD ≤ {low_threshold}
-    - **Rolling Window**: {rolling_window}-day moving volatility
-    """)
-
-# Gemini Functions
-def generate_gemini_insight(metrics, low, medium, window, start, end):
-    """Generate AI-powered market insight using Gemini"""
-    if not gemini_api_key:
-        return None
-        
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
-    prompt = f"""Analyze these stock metrics and provide a 3-4 line investment insight:
-    - Tickers: {[m['Ticker'] for m in metrics]}
-    - Volatilities: {[m['Volatility (SD)'] for m in metrics]}
-    - Risk Levels: {[m['Risk Level'] for m in metrics]}
-    - Analysis Period: {start} to {end}
-    - Risk Thresholds: Low(<{low}), Medium(<{medium}), High(>{medium})
-    - Window: {window}-day rolling
-    
-    Focus on:
-    1. Comparative risk analysis
-    2. Market condition implications
-    3. Investor recommendations
-    Use simple financial terms with emojis."""
-    
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Gemini API Error: {str(e)}")
-        return None
-
-# Data Functions
-@st.cache_data(ttl=3600)
-def load_data(tickers, start, end):
-    """Load stock data with progress tracking"""
-    with st.spinner("📥 Fetching market data..."):
-        return yf.download(tickers, start=start, end=end, group_by='ticker')
-
-def process_ticker(data, ticker, window):
-    """Process data for individual ticker"""
-    df = data[ticker].copy()
-    df['Return'] = df['Close'].pct_change()
-    df['Rolling Volatility'] = df['Return'].rolling(window).std()
-    df['MA'] = df['Close'].rolling(window).mean()
-    return df.dropna()
-
-def risk_assessment(std, low, medium):
-    """Determine risk category with dynamic thresholds"""
-    if std > medium: return '🔴 High'
-    if std > low: return '🟡 Medium'
-    return '🟢 Low'
-
-# Main App
-st.title("📈 Stock Volatility Analyzer")
-st.markdown("### Real-time Risk Analysis using Standard Deviation & Variance")
-
-# Input Controls
-col1, col2, col3 = st.columns([2,1,1])
-with col1:
-    tickers = st.multiselect(
-        "Select Stocks", 
-        ['AAPL', 'MSFT', 'GOOG', 'TSLA', 'AMZN', 'NFLX', 'NVDA', 'META'],
-        default=['AAPL', 'MSFT']
-    )
-with col2:
-    start_date = st.date_input("Start Date", datetime(2023,1,1))
-with col3:
-    end_date = st.date_input("End Date", datetime.today())
-
-# Main Analysis
-if tickers:
-    try:
-        data = load_data(tickers, start_date, end_date + pd.Timedelta(days=1))
-        metrics = []
-        returns = []
-
-        for ticker in tickers:
-            df = process_ticker(data, ticker, rolling_window)
-            std = df['Return'].std()
-            var = df['Return'].var()
-            
-            risk = risk_assessment(std, low_threshold, medium_threshold)
-            metrics.append({
-                'Ticker': ticker,
-                'Volatility (SD)': f"{std:.4f}",
-                'Variance': f"{var:.6f}",
-                'Risk Level': risk
-            })
-            
-            returns.append(df['Return'].rename(ticker))
-            
-            with st.expander(f"📊 {ticker} Analysis", expanded=True):
-                tab1, tab2, tab3 = st.tabs(["Price Action", "Volatility", "Returns"])
-                
-                with tab1:
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatter(x=df.index, y=df['Close'], name='Price', line=dict(color='#2c3e50')))
-                    fig.add_trace(go.Scatter(x=df.index, y=df['MA'], name=f'{rolling_window}D MA', line=dict(color='#e74c3c')))
-                    fig.update_layout(title=f"{ticker} Price & Moving Average", yaxis_title="Price")
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with tab2:
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatter(x=df.index, y=df['Rolling Volatility'], 
-                                       name='Volatility', fill='tozeroy', fillcolor='rgba(231,76,60,0.2)',
-                                       line=dict(color='#e74c3c')))
-                    fig.update_layout(title=f"{ticker} {rolling_window}-Day Rolling Volatility", yaxis_title="Volatility")
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with tab3:
-                    fig = px.histogram(df, x='Return', nbins=100, 
-                                     title=f"Daily Returns Distribution - {ticker}",
-                                     color_discrete_sequence=['#3498db'])
-                    fig.add_vline(x=std, line_dash="dash", line_color="#e74c3c", 
-                                annotation_text=f"SD: {std:.4f}")
-                    st.plotly_chart(fig, use_container_width=True)
-
-        # Cross-Asset Analysis
-        st.markdown("---")
-        st.header("📊 Cross-Asset Analysis")
-        
-        cols = st.columns(len(metrics))
-        for i, col in enumerate(cols):
-            with col:
-                metric = metrics[i]
-                color = "#2ecc71" if "Low" in metric['Risk Level'] else \
-                        "#f1c40f" if "Medium" in metric['Risk Level'] else "#e74c3c"
-                st.markdown(f"""
-                <div class="metric-box">
-                    <h3>{metric['Ticker']}</h3>
-                    <p style="color:{color}; font-size:1.5rem; margin:0.5rem 0">{metric['Risk Level']}</p>
-                    <p>Volatility: {metric['Volatility (SD)']}</p>
-                    <p>Variance: {metric['Variance']}</p>
-                </div>
-                """, unsafe_allow_html=True)
-        
-        returns_df = pd.concat(returns, axis=1).dropna()
-        corr_matrix = returns_df.corr()
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.subheader("📦 Return Distribution Comparison")
-            fig = px.box(returns_df.melt(var_name='Stock'), x='Stock', y='value', 
-                       color='Stock', color_discrete_sequence=px.colors.qualitative.Plotly)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            st.subheader("🌡️ Return Correlation Heatmap")
-            fig = px.imshow(corr_matrix, text_auto=".2f", color_continuous_scale='RdBu_r',
-                          aspect="auto", labels=dict(x="", y="", color="Correlation"))
-            st.plotly_chart(fig, use_container_width=True)
-
-        # AI Insights
-        if gemini_api_key:
-            st.markdown("---")
-            st.header("🧠 AI-Powered Market Insight")
-            insight = generate_gemini_insight(
-                metrics, low_threshold, medium_threshold, 
-                rolling_window, start_date, end_date
-            )
-            if insight:
-                st.markdown(f"""
-                <div class="gemini-insight">
-                    <div style="font-size:1.1rem; color:#2C3E50; line-height:1.6">
-                    {insight}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.warning("Could not generate insights. Check API key and try again.")
-
-    except KeyError as e:
-        st.error(f"Error loading data for ticker: {e}. Please check the ticker symbol.")
-    except Exception as e:
-        st.error(f"An error occurred: {str(e)}")
-
-else:
+import streamlit as st
+import yfinance as yf
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import google.generativeai as genai
+import hashlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from yfinance.exceptions import YFRateLimitError
+from kernels import rolling_panel
+from style import configure_page
+
+# Configuration
+CACHE_DIR = Path.home() / ".cache" / "svar"
+GEMINI_CACHE_TTL = 86400
+FETCH_RETRIES = 3
+STAT_FIELDS = ['Close', 'Return', 'Rolling Volatility', 'MA']
+RISK_LEVELS = np.array(['🟢 Low', '🟡 Medium', '🔴 High'])
+
+configure_page("📊 Stock Volatility Analyzer", "📈")
+
+# Sidebar - Concepts & Controls
+with st.sidebar:
+    st.title("📘 Concepts & Controls")
+    
+    # Gemini API Setup
+    st.subheader("🔑 Gemini API Setup")
+    gemini_api_key = st.text_input("Enter Gemini API Key", type="password",
+                                 help="Get from https://aistudio.google.com/app/apikey")
+    
+    # Risk Parameters
+    st.subheader("⚙️ Risk Parameters")
+    low_threshold = st.slider("Low Risk Threshold", 0.0, 0.1, 0.015, 0.001)
+    medium_threshold = st.slider("Medium Risk Threshold", 0.0, 0.1, 0.03, 0.001)
+    rolling_window = st.slider("Rolling Window (Days)", 5, 90, 30)
+    
+    # Educational Content
+    st.subheader("📚 Key Concepts")
+    st.markdown(f"""
+    - **Volatility**: Measured via Standard Deviation (SD) of returns
+    - **Risk Levels**:
+        - 🔴 High: SD > {medium_threshold}
+        - 🟡 Medium: {low_threshold} < SD ≤ {medium_threshold}
+        - 🟢 Low: SD ≤ {low_threshold}
+    - **Rolling Window**: {rolling_window}-day moving volatility
+    """)
+
+# Gemini Functions
+@st.cache_data(ttl=GEMINI_CACHE_TTL, show_spinner=False)
+def _gemini_response(prompt):
+    """Gemini completion for a prompt, memoized on disk by content hash"""
+    key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+    path = CACHE_DIR / "gemini" / f"{key}.txt"
+    if path.exists() and time.time() - path.stat().st_mtime < GEMINI_CACHE_TTL:
+        return path.read_text(encoding="utf-8")
+
+    model = genai.GenerativeModel('gemini-2.0-flash')
+    text = model.generate_content(prompt).text
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return text
+
+def generate_gemini_insight(metrics, low, medium, window, start, end):
+    """Generate AI-powered market insight using Gemini"""
+    if not gemini_api_key:
+        return None
+        
+    genai.configure(api_key=gemini_api_key)
+    
+    prompt = f"""Analyze these stock metrics and provide a 3-4 line investment insight:
+    - Tickers: {[m['Ticker'] for m in metrics]}
+    - Volatilities: {[m['Volatility (SD)'] for m in metrics]}
+    - Risk Levels: {[m['Risk Level'] for m in metrics]}
+    - Analysis Period: {start} to {end}
+    - Risk Thresholds: Low(<{low}), Medium(<{medium}), High(>{medium})
+    - Window: {window}-day rolling
+    
+    Focus on:
+    1. Comparative risk analysis
+    2. Market condition implications
+    3. Investor recommendations
+    Use simple financial terms with emojis."""
+    
+    try:
+        return _gemini_response(prompt)
+    except Exception as e:
+        st.error(f"Gemini API Error: {str(e)}")
+        return None
+
+# Data Functions
+def _download(tickers, start, end):
+    """Batched daily OHLCV for [start, end) as a (ticker, field) panel, retried with back-off
+
+    yf.Tickers logs and swallows each ticker's failure, leaving an all-NaN
+    block in the result, so tickers that come back without a bar are retried
+    as well, and raise KeyError once the attempts run out rather than being
+    cached as missing. That only applies when the range holds a past weekday:
+    a range of just today (before the open) or a weekend may legitimately be
+    empty, so its empty blocks are returned as they are."""
+    today = pd.Timestamp.today().normalize()
+    required = len(pd.bdate_range(start, min(end, today) - pd.Timedelta(days=1))) > 0
+    blocks = {}
+    pending = list(tickers)
+    for attempt in range(FETCH_RETRIES):
+        if attempt:
+            time.sleep(2 ** (attempt - 1))
+        try:
+            data = yf.Tickers(' '.join(pending)).history(
+                start=start, end=end, threads=True, actions=False,
+                group_by='ticker', progress=False)
+        except (OSError, YFRateLimitError):
+            if attempt == FETCH_RETRIES - 1:
+                raise
+            continue
+        for ticker in pending:
+            block = data[ticker] if ticker in data.columns.get_level_values(0) else pd.DataFrame()
+            if block.notna().any(axis=None) or not required:
+                blocks[ticker] = block
+        pending = [t for t in pending if t not in blocks]
+        if not pending:
+            return pd.concat(blocks, axis=1)
+    raise KeyError(', '.join(pending))
+
+def _missing_ranges(cached, start, end):
+    """Slices of [start, end) that the cached history does not cover yet
+
+    Each slice also spans the cached bar it adjoins, so _load_panel can check
+    the stored series against a fresh fetch before stitching the two."""
+    if cached is None or cached.empty:
+        return [(start, end)]
+    first, last = cached.index.min(), cached.index.max()
+    ranges = []
+    if start < first:
+        ranges.append((start, first + pd.Timedelta(days=1)))
+    # Re-fetching the last bar also repairs caches written before today's bar
+    # stopped being persisted, which may hold an intraday value for it
+    if end > last:
+        ranges.append((last, end))
+    return ranges
+
+def _rescaled(cached, frame):
+    """True if `frame` disagrees with the cached closes on the bars both hold"""
+    common = cached.index.intersection(frame.index)
+    return not np.allclose(frame.loc[common, 'Close'], cached.loc[common, 'Close'], equal_nan=True)
+
+def _write_parquet(frame, path):
+    """Write to a temp file and rename it over `path`, so other sessions never read a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        frame.to_parquet(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _load_panel(tickers, start, end):
+    """Assemble the (ticker, field) panel, downloading only what the parquet cache lacks"""
+    today = pd.Timestamp.today().normalize()
+    paths = {ticker: CACHE_DIR / f"{ticker}.parquet" for ticker in tickers}
+    cached = {ticker: pd.read_parquet(path) if path.exists() else None for ticker, path in paths.items()}
+
+    # Tickers missing the same slice share one batched request
+    wanted = {}
+    for ticker in tickers:
+        for rng in _missing_ranges(cached[ticker], start, end):
+            wanted.setdefault(rng, []).append(ticker)
+    fetched = {ticker: [] for ticker in tickers}
+
+    def fetch(group, s, e):
+        data = _download(group, s, e)
+        for ticker in group:
+            fetched[ticker].append(data[ticker].dropna(how='all'))
+
+    for (s, e), group in wanted.items():
+        fetch(group, s, e)
+
+    # With auto_adjust, a split or dividend rescales every earlier close. If the
+    # re-fetched overlap bar moved, the cached series is on the old scale and
+    # cannot be stitched to the new bars, so it is replaced by a full fetch.
+    # That covers everything the file held, not just this call's range (the
+    # live load only asks for today), and drops history already served from
+    # memory on the old scale
+    rescaled = [t for t in tickers
+                if cached[t] is not None and any(_rescaled(cached[t], f) for f in fetched[t])]
+    if rescaled:
+        span_start = min([start] + [cached[t].index.min() for t in rescaled])
+        for ticker in rescaled:
+            cached[ticker], fetched[ticker] = None, []
+        fetch(rescaled, span_start, end)
+        _load_history.clear()
+
+    panel = {}
+    for ticker in tickers:
+        history = cached[ticker]
+        if fetched[ticker]:
+            frames = [f for f in [history] if f is not None and not f.empty] + fetched[ticker]
+            history = pd.concat(frames)
+            history = history[~history.index.duplicated(keep='last')].sort_index()
+            # Today's bar keeps moving until the close, so it is served from memory
+            # (load_data's short-TTL cache) and never written to disk. The re-fetched
+            # overlap bar alone is no reason to rewrite the file
+            closed = history[history.index < today]
+            old = cached[ticker]
+            if not closed.empty and (old is None or not closed.index.isin(old.index).all()):
+                _write_parquet(closed, paths[ticker])
+        if history is None or history.empty:
+            panel[ticker] = pd.DataFrame()
+        else:
+            panel[ticker] = history[(history.index >= start) & (history.index < end)]
+    return pd.concat(panel, axis=1)
+
+@st.cache_data(ttl=365 * 86400, show_spinner=False)
+def _load_history(tickers, start, end):
+    """Panel of closed daily bars in [start, end); these never change"""
+    return _load_panel(tickers, start, end)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_today(tickers, today):
+    """Panel holding only today's bar, which moves until the close"""
+    return _load_panel(tickers, today, today + pd.Timedelta(days=1))
+
+def load_data(tickers, start, end):
+    """Load stock data with progress tracking"""
+    tickers = tuple(tickers)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    today = pd.Timestamp.today().normalize()
+    with st.spinner("📥 Fetching market data..."):
+        if end <= today:
+            return _load_history(tickers, start, end)
+        if start >= today:
+            return _load_today(tickers, today)
+        # Only the last day is re-fetched on warm reruns; the history stays cached.
+        # Loading it first means the live fetch always overlaps a cached bar
+        _load_history(tickers, start, today)
+        live = _load_today(tickers, today)
+        # A cache hit unless the live fetch found a rescale and cleared the history
+        return pd.concat([_load_history(tickers, start, today), live])
+
+@st.cache_data(ttl=3600)
+def _process_panel_cached(tickers: tuple, close_arr: np.ndarray, index_ns: np.ndarray, window: int):
+    """Rolling statistics for all tickers, cached separately from the download"""
+    out = rolling_panel(close_arr, window)
+    columns = pd.MultiIndex.from_product([STAT_FIELDS, tickers])
+    return pd.DataFrame(out, index=pd.to_datetime(index_ns), columns=columns)
+
+@dataclass
+class OnlineRollingStd:
+    """Rolling mean and sample SD that can be extended one sample at a time"""
+    window: int
+    buffer: np.ndarray = field(init=False)
+    pos: int = 0
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def __post_init__(self):
+        self.buffer = np.full(self.window, np.nan)
+
+    def update(self, x):
+        """Push one sample and return the window's (mean, SD), NaN until it is full"""
+        slot = self.pos % self.window
+        x_old = self.buffer[slot]
+        if not np.isnan(x_old):
+            self.count -= 1
+            if self.count == 0:
+                self.mean = self.m2 = 0.0
+            else:
+                delta = x_old - self.mean
+                self.mean -= delta / self.count
+                self.m2 -= delta * (x_old - self.mean)
+        self.buffer[slot] = x
+        self.pos += 1
+        if not np.isnan(x):
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+        if self.count < self.window:
+            return np.nan, np.nan
+        return self.mean, np.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+@dataclass
+class TickerState:
+    """Last computed stats for a ticker plus the Welford state to extend them"""
+    window: int
+    frame: pd.DataFrame
+    last_close: float
+    vol: OnlineRollingStd
+    ma: OnlineRollingStd
+
+    @classmethod
+    def from_frame(cls, frame, window):
+        """Rebuild the online state from the trailing window of a computed frame"""
+        vol, ma = OnlineRollingStd(window), OnlineRollingStd(window)
+        for r in frame['Return'].to_numpy()[-window:]:
+            vol.update(r)
+        for c in frame['Close'].to_numpy()[-window:]:
+            ma.update(c)
+        closes = frame['Close'].dropna()
+        last_close = closes.iloc[-1] if len(closes) else np.nan
+        return cls(window, frame, last_close, vol, ma)
+
+    def extends_to(self, close, window):
+        """True if `close` is this ticker's previous series plus newer bars
+
+        Every overlapping close is compared, so a revised earlier bar (e.g. a
+        re-adjusted history) forces a recompute instead of being extended."""
+        n = len(self.frame)
+        if window != self.window or n == 0 or len(close) < n:
+            return False
+        return (close.index[:n].equals(self.frame.index)
+                and np.array_equal(close.to_numpy(dtype=np.float64)[:n],
+                                   self.frame['Close'].to_numpy(), equal_nan=True))
+
+    def extend(self, close):
+        """Feed bars newer than the stored frame through the online state"""
+        new = close.iloc[len(self.frame):]
+        if new.empty:
+            return
+        rows = []
+        for price in new.to_numpy(dtype=np.float64):
+            # Mirror pct_change's forward fill over missing prices
+            filled = self.last_close if np.isnan(price) else price
+            ret = filled / self.last_close - 1
+            self.last_close = filled
+            _, rolling_vol = self.vol.update(ret)
+            rolling_ma, _ = self.ma.update(price)
+            rows.append((price, ret, rolling_vol, rolling_ma))
+        added = pd.DataFrame(rows, index=new.index, columns=self.frame.columns)
+        self.frame = pd.concat([self.frame, added])
+
+def process_tickers(data, tickers, window):
+    """Process the whole Close panel at once; columns are (field, ticker)
+
+    Tickers whose history only grew since the previous rerun (e.g. end date
+    moved forward) are extended from the state kept in st.session_state
+    rather than recomputed."""
+    close = data.xs('Close', axis=1, level=1)[tickers]
+    # pandas 3 may parse dates at us/s resolution; the panel cache takes ns
+    close.index = close.index.as_unit('ns')
+    states = st.session_state.setdefault('rolling_state', {})
+    stale = [t for t in tickers if t not in states or not states[t].extends_to(close[t], window)]
+    if stale:
+        stats = _process_panel_cached(tuple(stale), close[stale].to_numpy(dtype=np.float64),
+                                      close.index.asi8, window)
+        for ticker in stale:
+            states[ticker] = TickerState.from_frame(stats.xs(ticker, axis=1, level=1), window)
+    for ticker in tickers:
+        if ticker not in stale:
+            states[ticker].extend(close[ticker])
+    stats = pd.concat({
+        name: pd.DataFrame({t: states[t].frame[name] for t in tickers})
+        for name in STAT_FIELDS
+    }, axis=1)
+    # The first `window` rows can never hold a full window of returns
+    return stats.iloc[window:]
+
+def box_summary(values):
+    """Tukey box-plot statistics, so plotly receives 5 numbers instead of every point"""
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return dict(
+        q1=[q1], median=[median], q3=[q3],
+        lowerfence=[values[values >= q1 - 1.5 * iqr].min()],
+        upperfence=[values[values <= q3 + 1.5 * iqr].max()],
+    )
+
+def correlation_matrix(returns_df):
+    """Pearson correlation as a single GEMM over standardized float32 returns"""
+    values = returns_df.to_numpy(dtype=np.float64)
+    n, k = values.shape
+    # Like DataFrame.corr(): NaN for fewer than two rows or a constant column
+    corr = np.full((k, k), np.nan, dtype=np.float32)
+    if n >= 2:
+        std = values.std(axis=0, ddof=1)
+        ok = std > 0
+        z = ((values[:, ok] - values[:, ok].mean(axis=0)) / std[ok]).astype(np.float32)
+        corr[np.ix_(ok, ok)] = (z.T @ z) / (n - 1)
+    return pd.DataFrame(corr, index=returns_df.columns, columns=returns_df.columns)
+
+def risk_color(level):
+    """CSS for a risk-level cell in the metrics table"""
+    color = "#2ecc71" if "Low" in level else "#f1c40f" if "Medium" in level else "#e74c3c"
+    return f"color: {color}; font-weight: bold"
+
+def risk_assessment(std, low, medium):
+    """Determine risk category with dynamic thresholds; vectorized over `std`"""
+    # side='left' keeps the boundaries inclusive (SD == low is Low); min() keeps
+    # the edges sorted when the sliders cross, where everything <= medium is Low
+    idx = np.searchsorted([min(low, medium), medium], std, side='left')
+    # searchsorted places NaN above every limit; the comparisons it replaced gave Low
+    idx = np.where(np.isnan(std), 0, idx)
+    return RISK_LEVELS[idx]
+
+# Main App
+st.title("📈 Stock Volatility Analyzer")
+st.markdown("### Real-time Risk Analysis using Standard Deviation & Variance")
+
+# Input Controls
+col1, col2, col3 = st.columns([2,1,1])
+with col1:
+    tickers = st.multiselect(
+        "Select Stocks", 
+        ['AAPL', 'MSFT', 'GOOG', 'TSLA', 'AMZN', 'NFLX', 'NVDA', 'META'],
+        default=['AAPL', 'MSFT']
+    )
+with col2:
+    start_date = st.date_input("Start Date", datetime(2023,1,1))
+with col3:
+    end_date = st.date_input("End Date", datetime.today())
+
+# Main Analysis
+if tickers:
+    try:
+        data = load_data(tickers, start_date, end_date + pd.Timedelta(days=1))
+        if data.empty:
+            # e.g. only today selected, on a weekend or before the open
+            st.info("📭 No trading data in the selected range yet.")
+            st.stop()
+        stats = process_tickers(data, tickers, rolling_window)
+
+        # SD/variance over the rows the old per-ticker dropna() kept: a missing
+        # close also voids the MA for the next window, though its 0.0 return
+        # (pct_change forward-fills) leaves the volatility defined
+        complete = (stats['Close'].notna() & stats['Return'].notna()
+                    & stats['Rolling Volatility'].notna() & stats['MA'].notna())
+        valid_returns = stats['Return'].where(complete)
+        stds = valid_returns.std()
+        variances = valid_returns.var()
+        # tolist() yields plain str: np.str_ would reprint as np.str_('🟢 Low') in the Gemini prompt
+        risks = pd.Series(risk_assessment(stds.to_numpy(), low_threshold, medium_threshold).tolist(),
+                          index=stds.index)
+        metrics = []
+
+        # One figure per tab, one trace per ticker
+        palette = px.colors.qualitative.Plotly
+        price_fig, vol_fig, ret_fig = go.Figure(), go.Figure(), go.Figure()
+        # Shared bin edges so the return histograms overlay bin for bin
+        all_returns = valid_returns.to_numpy().ravel()
+        edges = np.histogram_bin_edges(all_returns[~np.isnan(all_returns)], bins=100)
+        centers = (edges[:-1] + edges[1:]) / 2
+
+        for i, ticker in enumerate(tickers):
+            # process_tickers already trimmed the warm-up rows; any NaN left is a gap in
+            # that ticker's history, which plotly draws as a break in the line
+            df = stats.xs(ticker, axis=1, level=1)
+            # Stats stay float64; float32 halves what plotly serializes
+            plot_df = df.astype(np.float32)
+            std = stds[ticker]
+            var = variances[ticker]
+            risk = risks[ticker]
+            color = palette[i % len(palette)]
+            
+            metrics.append({
+                'Ticker': ticker,
+                'Volatility (SD)': f"{std:.4f}",
+                'Variance': f"{var:.6f}",
+                'Risk Level': risk
+            })
+            
+            price_fig.add_trace(go.Scatter(x=df.index, y=plot_df['Close'].to_numpy(), name=ticker, legendgroup=ticker,
+                                           line=dict(color=color)))
+            price_fig.add_trace(go.Scatter(x=df.index, y=plot_df['MA'].to_numpy(), name=f'{ticker} {rolling_window}D MA',
+                                           legendgroup=ticker, line=dict(color=color, dash='dot')))
+            vol_fig.add_trace(go.Scatter(x=df.index, y=plot_df['Rolling Volatility'].to_numpy(), name=ticker,
+                                         line=dict(color=color)))
+            ticker_returns = valid_returns[ticker].to_numpy()
+            counts, _ = np.histogram(ticker_returns[~np.isnan(ticker_returns)], bins=edges)
+            ret_fig.add_trace(go.Bar(x=centers, y=counts, width=np.diff(edges), name=ticker,
+                                     marker_color=color, opacity=0.6))
+            ret_fig.add_vline(x=std, line_dash="dash", line_color=color,
+                              annotation_text=f"{ticker} SD: {std:.4f}")
+
+        with st.expander("📊 Ticker Analysis", expanded=True):
+            tab1, tab2, tab3 = st.tabs(["Price Action", "Volatility", "Returns"])
+            
+            with tab1:
+                price_fig.update_layout(title="Price & Moving Average", yaxis_title="Price")
+                st.plotly_chart(price_fig, use_container_width=True)
+            
+            with tab2:
+                vol_fig.update_layout(title=f"{rolling_window}-Day Rolling Volatility", yaxis_title="Volatility")
+                st.plotly_chart(vol_fig, use_container_width=True)
+            
+            with tab3:
+                ret_fig.update_layout(title="Daily Returns Distribution", xaxis_title="Return",
+                                      yaxis_title="Count", barmode='overlay', bargap=0)
+                st.plotly_chart(ret_fig, use_container_width=True)
+
+        # Cross-Asset Analysis
+        st.markdown("---")
+        st.header("📊 Cross-Asset Analysis")
+        
+        metrics_df = pd.DataFrame(metrics).set_index('Ticker')
+        st.dataframe(metrics_df.style.map(risk_color, subset=['Risk Level']), use_container_width=True)
+        
+        returns_df = valid_returns.dropna()
+        corr_matrix = correlation_matrix(returns_df)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("📦 Return Distribution Comparison")
+            fig = go.Figure()
+            palette = px.colors.qualitative.Plotly
+            for i, ticker in enumerate(returns_df.columns):
+                values = returns_df[ticker].to_numpy()
+                # No dates where every ticker has a full window: nothing to summarize
+                if values.size == 0:
+                    continue
+                fig.add_trace(go.Box(x=[ticker], name=ticker, marker_color=palette[i % len(palette)],
+                                     **box_summary(values)))
+            fig.update_layout(xaxis_title="Stock", yaxis_title="value")
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            st.subheader("🌡️ Return Correlation Heatmap")
+            fig = px.imshow(corr_matrix, text_auto=".2f", color_continuous_scale='RdBu_r',
+                          aspect="auto", labels=dict(x="", y="", color="Correlation"))
+            st.plotly_chart(fig, use_container_width=True)
+
+        # AI Insights
+        if gemini_api_key:
+            st.markdown("---")
+            st.header("🧠 AI-Powered Market Insight")
+            insight = generate_gemini_insight(
+                metrics, low_threshold, medium_threshold, 
+                rolling_window, start_date, end_date
+            )
+            if insight:
+                st.markdown(f"""
+                <div class="gemini-insight">
+                    <div style="font-size:1.1rem; color:#2C3E50; line-height:1.6">
+                    {insight}
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.warning("Could not generate insights. Check API key and try again.")
+
+    except KeyError as e:
+        st.error(f"Error loading data for ticker: {e}. Please check the ticker symbol.")
+    except Exception as e:
+        st.error(f"An error occurred: {str(e)}")
+
+else:
     st.info("👈 Select stocks from the sidebar to begin analysis")
\ No newline at end of file
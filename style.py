@@ -0,0 +1,16 @@
+"""Page setup shared by the Streamlit apps."""
+from pathlib import Path
+
+import streamlit as st
+
+CSS_PATH = Path(__file__).parent / "assets" / "style.css"
+
+@st.cache_resource(show_spinner=False)
+def css():
+    """Shared stylesheet, read from disk once per process"""
+    return CSS_PATH.read_text(encoding="utf-8")
+
+def configure_page(title, icon):
+    """Set the wide page layout and inject the shared stylesheet"""
+    st.set_page_config(page_title=title, layout="wide", page_icon=icon)
+    st.markdown(f"<style>{css()}</style>", unsafe_allow_html=True)
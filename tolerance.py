@@ -4,45 +4,11 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import kernels
+from style import configure_page
 
 # Configuration
-st.set_page_config(
-    page_title="⚙️ Engineering Tolerances Analyzer",
-    layout="wide",
-    page_icon="⚙️"
-)
-
-# Custom CSS
-st.markdown("""
-<style>
-    [data-testid=stSidebar] {
-        background: linear-gradient(0deg, #2C3E50 0%, #3498DB 100%);
-        color: white;
-    }
-    .main .block-container {
-        background: linear-gradient(180deg, #ffffff 0%, #f8f9fa 100%);
-        padding: 2rem 2.5rem;
-    }
-    h1, h2, h3 {
-        color: #2C3E50 !important;
-        border-bottom: 2px solid #3498DB;
-        padding-bottom: 0.3rem;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-    }
-    .metric-box {
-        padding: 1.5rem;
-        border-radius: 10px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        background: white;
-        margin: 0.5rem 0;
-        transition: all 0.3s ease;
-    }
-    .metric-box:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 6px 12px rgba(0,0,0,0.15) !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+configure_page("⚙️ Engineering Tolerances Analyzer", "⚙️")
 
 # Sidebar - Concepts & Controls
 with st.sidebar:
@@ -81,15 +47,19 @@ with st.sidebar:
 # Data Functions (Updated for Variance)
 def calculate_variance(measurements):
     """Calculate variance for given measurements"""
-    return np.var(measurements)
+    return kernels.variance(measurements)
+
+RISK_LEVELS = np.array(['🟢 Low Risk', '🟡 Medium Risk', '🔴 High Risk'])
 
 def risk_assessment(variance, low, high):
-    """Determine risk category based on tolerance levels (variance-based)"""
-    if variance > high:
-        return '🔴 High Risk'
-    elif variance > low:
-        return '🟡 Medium Risk'
-    return '🟢 Low Risk'
+    """Determine risk category based on tolerance levels (variance-based)
+
+    Works on a scalar or an array of variances; the bucketing is a single
+    branchless searchsorted over the (sorted) limits."""
+    idx = np.searchsorted([min(low, high), high], variance, side='left')
+    # searchsorted places NaN above every limit; the comparisons it replaced gave Low
+    idx = np.where(np.isnan(variance), 0, idx)
+    return RISK_LEVELS[idx]
 
 # Main App
 st.title("⚙️ Engineering Tolerances Analyzer")
@@ -103,8 +73,9 @@ with col1:
 # Process
 if measurements_input:
     try:
-        measurements = list(map(float, measurements_input.split(',')))
-        if len(measurements) < 2:
+        # Converted in C like float() per token: empty or malformed tokens raise
+        measurements = np.array(measurements_input.split(','), dtype=np.float64)
+        if measurements.size < 2:
             st.warning("Please provide at least two measurements.")
         else:
             variance = calculate_variance(measurements)
@@ -114,11 +85,15 @@ if measurements_input:
             st.markdown(f"### **Variance: {variance:.6f}**")
             st.markdown(f"### **Risk Level: {risk_level}**")
 
+            # Bin here so only the 10 bars are sent to the browser
+            counts, edges = np.histogram(measurements, bins=10)
             fig = go.Figure()
-            fig.add_trace(go.Histogram(x=measurements, nbinsx=10, name='Measurements'))
+            fig.add_trace(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                                 name='Measurements'))
             fig.update_layout(title="Measurements Distribution",
                               xaxis_title="Measurement Value", 
-                              yaxis_title="Frequency")
+                              yaxis_title="Frequency",
+                              bargap=0)
             st.plotly_chart(fig, use_container_width=True)
 
             st.markdown(f"""